@@ -1,9 +1,13 @@
+import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from transformers import pipeline
 import ollama
+import os
+from collections import Counter
+
+from shared import generation_profiles, ollama_warmup, telemetry
+from shared.singleflight import SingleFlight, make_key
 
 # ---------------- CONFIG ----------------
 FAQ_CSV = "ecommerce_faq.csv"
@@ -11,64 +15,125 @@ PRODUCTS_CSV = "products.csv"
 REVIEWS_CSV = "reviews.csv"
 OLLAMA_MODEL = "qwen2.5:0.5b"
 FAQ_THRESHOLD = 0.65
+# Router tiers run cheapest first; each tier's thresholds decide whether it resolves the message
+ROUTER_CONFIG = {
+    "lexical": {"enabled": True},
+    "embedding": {"faq_threshold": FAQ_THRESHOLD, "intent_threshold": 0.6},
+}
+RECOMMEND_KEYWORDS = ["recommend", "suggest", "similar", "alternatives"]
+REVIEW_KEYWORDS = ["review", "feedback", "opinion", "customer say"]
+# Example phrasings used for embedding-based intent detection
+INTENT_EXAMPLES = {
+    "recommend": ["Can you recommend a good product?", "What should I buy?", "Show me something like this"],
+    "reviews": ["What do customers think of this product?", "Is this product any good according to buyers?",
+                "How is this product rated?"],
+}
+# Set to the model server socket (python -m shared.model_server) to share one copy of the models
+MODEL_SERVER_SOCKET = os.environ.get("MODEL_SERVER_SOCKET")
 # System role for Ollama
 system_prompt = {
     "role": "system",
     "content": "You are an e-commerce assistant. Be concise, helpful, and answer only from given context."}
 
 # ---------------- LOAD MODELS ----------------
-print("Loading models...")
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")  # For FAQ embeddings
-sentiment_pipeline = pipeline("sentiment-analysis")        # For sentiment analysis
+if MODEL_SERVER_SOCKET:
+    from shared.model_server import ModelClient, RemoteEncoder, RemoteSentiment
+    print(f"Using model server at {MODEL_SERVER_SOCKET}")
+    model_client = ModelClient(MODEL_SERVER_SOCKET)
+    embedding_model = RemoteEncoder(client=model_client)     # For FAQ embeddings
+    sentiment_pipeline = RemoteSentiment(client=model_client)  # For sentiment analysis
+else:
+    # INFERENCE_BACKEND=onnx-int8 selects the quantized ONNX Runtime path (see shared/inference_backends.py)
+    from shared.inference_backends import get_backend, load_encoder, load_sentiment
+    print(f"Loading models ({get_backend()} backend)...")
+    embedding_model = load_encoder()       # For FAQ embeddings
+    sentiment_pipeline = load_sentiment()  # For sentiment analysis
 
 # ---------------- LOAD DATA ----------------
 faq_df = pd.read_csv(FAQ_CSV)
 products_df = pd.read_csv(PRODUCTS_CSV)
 reviews_df = pd.read_csv(REVIEWS_CSV)
 # Prepare FAQ embeddings
-faq_df["embedding"] = faq_df["prompt"].apply(lambda q: embedding_model.encode(q))
+faq_df["embedding"] = list(embedding_model.encode(faq_df["prompt"].tolist()))
+faq_matrix = np.vstack(faq_df["embedding"].to_numpy())
+faq_matrix = faq_matrix / np.linalg.norm(faq_matrix, axis=1, keepdims=True)
+# Prepare intent embeddings
+intent_names = [intent for intent, examples in INTENT_EXAMPLES.items() for _ in examples]
+intent_matrix = np.asarray(embedding_model.encode([ex for examples in INTENT_EXAMPLES.values() for ex in examples]))
+intent_matrix = intent_matrix / np.linalg.norm(intent_matrix, axis=1, keepdims=True)
 # Prepare TF-IDF for products
 products_df["text"] = products_df["name"] + " " + products_df["brand"] + " " + products_df["description"]
 tfidf = TfidfVectorizer()
 tfidf_matrix = tfidf.fit_transform(products_df["text"])
+# Coalesces identical in-flight LLM requests
+llm_flights = SingleFlight("ex1")
+# Token limit, stop strings and temperature for product Q&A
+QA_GENERATION = generation_profiles.request_fields("product_qa")
 
 # ---------------- FUNCTIONS ----------------
-def find_best_faq_match(user_question):
+def embed_query(text):
+    """Encode a query as a unit vector."""
+    with telemetry.span("ex1", "embedding"):
+        embedding = np.asarray(embedding_model.encode(text))
+    return embedding / np.linalg.norm(embedding)
+def find_best_faq_match(user_question, user_embedding=None):
     """Find best FAQ match based on embeddings."""
-    user_embedding = embedding_model.encode(user_question)
-    similarities = [cosine_similarity([user_embedding], [emb])[0][0] for emb in faq_df["embedding"]]
-    best_index = similarities.index(max(similarities))
-    return faq_df.iloc[best_index]["prompt"], faq_df.iloc[best_index]["response"], similarities[best_index]
+    if user_embedding is None:
+        user_embedding = embed_query(user_question)
+    with telemetry.span("ex1", "faq_similarity"):
+        similarities = faq_matrix @ user_embedding
+    best_index = int(similarities.argmax())
+    return faq_df.iloc[best_index]["prompt"], faq_df.iloc[best_index]["response"], float(similarities[best_index])
+def detect_intent(user_embedding):
+    """Return the closest intent and its similarity based on example phrasings."""
+    similarities = intent_matrix @ user_embedding
+    best_index = int(similarities.argmax())
+    return intent_names[best_index], float(similarities[best_index])
 def get_top_product(query, top_k=1):
     """Return top-k product rows based on TF-IDF similarity."""
-    query_vec = tfidf.transform([query])
-    similarity = cosine_similarity(query_vec, tfidf_matrix)[0]
-    top_idx = similarity.argsort()[-top_k:][::-1]
+    with telemetry.span("ex1", "tfidf_retrieval"):
+        query_vec = tfidf.transform([query])
+        similarity = cosine_similarity(query_vec, tfidf_matrix)[0]
+        top_idx = similarity.argsort()[-top_k:][::-1]
     return products_df.iloc[top_idx], similarity[top_idx]
-def product_qa_llm(user_query):
-    """Answer using Ollama and top product details."""
-    top_product = get_top_product(user_query, top_k=1)[0].iloc[0]
-    product_details = (
-        f"Product ID: {top_product['product_id']}\n"
-        f"Name: {top_product['name']}\n"
-        f"Category: {top_product['category']}\n"
-        f"Brand: {top_product['brand']}\n"
-        f"Price: {top_product['price']}\n"
-        f"Description: {top_product['description']}\n"  )
-    prompt = f"""
+def ollama_chat_stream(messages):
+    """Stream a chat completion from Ollama, recording token metrics once per generation."""
+    for chunk in ollama.chat(model=OLLAMA_MODEL, messages=messages, stream=True,
+                             keep_alive=ollama_warmup.KEEP_ALIVE, **QA_GENERATION):
+        if chunk.get("done"):
+            telemetry.record_ollama("ex1", chunk)
+        yield chunk
+def build_qa_prompt(user_query, product_details):
+    """Build the product Q&A prompt."""
+    return f"""
     Answer the user's question using ONLY the product details below.
     If the answer is not available, say: 'I don't have that information.'
     {product_details}
     User Query: {user_query} """
-    response = ollama.chat(model=OLLAMA_MODEL, messages=[
-        system_prompt,
-        {"role": "user", "content": prompt} ])
-    return response["message"]["content"]
+def product_qa_llm(user_query):
+    """Answer using Ollama and top product details."""
+    top_product = get_top_product(user_query, top_k=1)[0].iloc[0]
+    with telemetry.span("ex1", "prompt_build"):
+        product_details = (
+            f"Product ID: {top_product['product_id']}\n"
+            f"Name: {top_product['name']}\n"
+            f"Category: {top_product['category']}\n"
+            f"Brand: {top_product['brand']}\n"
+            f"Price: {top_product['price']}\n"
+            f"Description: {top_product['description']}\n"  )
+        prompt = build_qa_prompt(user_query, product_details)
+    messages = [system_prompt, {"role": "user", "content": prompt}]
+    ollama_warmup.touch()
+    # Identical concurrent questions share one generation
+    with telemetry.span("ex1", "llm"):
+        chunks = llm_flights.stream(make_key(OLLAMA_MODEL, QA_GENERATION, messages), lambda: ollama_chat_stream(messages))
+        return "".join(chunk["message"]["content"] for chunk in chunks)
 def recommend_products(user_query, top_k=3):
     """Return top-k recommended products."""
-    query_vec = tfidf.transform([user_query])
-    similarity = cosine_similarity(query_vec, tfidf_matrix)[0]
-    top_indices = similarity.argsort()[-top_k:][::-1]
+    with telemetry.span("ex1", "tfidf_retrieval"):
+        query_vec = tfidf.transform([user_query])
+        similarity = cosine_similarity(query_vec, tfidf_matrix)[0]
+        top_indices = similarity.argsort()[-top_k:][::-1]
     recommendations = products_df.iloc[top_indices][['product_id', 'name', 'price', 'brand']]
     return recommendations
 def get_product_reviews_sentiment(user_query):
@@ -91,7 +156,8 @@ def get_product_reviews_sentiment(user_query):
 
         # Analyze each review
         for review in product_reviews["review"]:
-            result = sentiment_pipeline(review)[0]
+            with telemetry.span("ex1", "sentiment"):
+                result = sentiment_pipeline(review)[0]
             sentiment = result["label"]
             score = round(result["score"], 2)
             response_lines.append(f"{sentiment} (score: {score})\nReview: {review}\n")
@@ -99,35 +165,78 @@ def get_product_reviews_sentiment(user_query):
         return "No reviews available for matched products."
     return "\n".join(response_lines)
 
+# ---------------- ROUTER ----------------
+route_counts = Counter()  # (tier, route) -> messages resolved
+def format_recommendations(user_input):
+    recs = recommend_products(user_input)
+    result = "Recommended Products:\n"
+    for _, row in recs.iterrows():
+        result += f"- {row['name']} ({row['brand']}) - ₹{row['price']}\n"
+    return result
+def lexical_tier(user_input, text_lower):
+    """Tier 1: keyword intent detection, no model calls."""
+    if not ROUTER_CONFIG["lexical"]["enabled"]:
+        return None
+    if any(word in text_lower for word in RECOMMEND_KEYWORDS):
+        return "recommend", format_recommendations(user_input)
+    if any(word in text_lower for word in REVIEW_KEYWORDS):
+        return "reviews", get_product_reviews_sentiment(user_input)
+    return None
+def embedding_tier(user_input, text_lower):
+    """Tier 2: one embedding shared by FAQ matching and intent detection."""
+    config = ROUTER_CONFIG["embedding"]
+    user_embedding = embed_query(user_input)
+    matched_q, matched_a, score = find_best_faq_match(user_input, user_embedding)
+    if score >= config["faq_threshold"]:
+        return "faq", f"[FAQ Match] {matched_a}"
+    intent, intent_score = detect_intent(user_embedding)
+    if intent_score >= config["intent_threshold"]:
+        if intent == "recommend":
+            return "recommend", format_recommendations(user_input)
+        return "reviews", get_product_reviews_sentiment(user_input)
+    return None
+def llm_tier(user_input, text_lower):
+    """Tier 3: product Q&A via LLM, always resolves."""
+    return "product_qa", product_qa_llm(user_input)
+ROUTER_TIERS = [("lexical", lexical_tier), ("embedding", embedding_tier), ("llm", llm_tier)]
+def router_stats():
+    """Share of traffic resolved by each tier and route."""
+    total = sum(route_counts.values()) or 1
+    return "\n".join(f"{tier:<10} {route:<12} {count:>6} ({count / total:.0%})"
+                     for (tier, route), count in route_counts.most_common())
+
 # ---------------- CHATBOT LOGIC ----------------
 def chatbot_response(user_input):
+    with telemetry.span("ex1", "chatbot_response"):
+        return _chatbot_response(user_input)
+
+def _chatbot_response(user_input):
     user_input = user_input.strip()
     if not user_input:
         return "Please enter a valid query."
-    # 1. Try FAQ match
-    matched_q, matched_a, score = find_best_faq_match(user_input)
-    if score >= FAQ_THRESHOLD:
-        return f"[FAQ Match] {matched_a}"
-    # 2. If query asks for recommendations
-    if any(word in user_input.lower() for word in ["recommend", "suggest", "similar", "alternatives"]):
-        recs = recommend_products(user_input)
-        result = "Recommended Products:\n"
-        for _, row in recs.iterrows():
-            result += f"- {row['name']} ({row['brand']}) - ₹{row['price']}\n"
-        return result
-    # 3. If query asks about reviews or sentiment
-    if any(word in user_input.lower() for word in ["review", "feedback", "opinion", "customer say"]):
-        return get_product_reviews_sentiment(user_input)
-    # 4. Default → Product Q&A via LLM
-    return product_qa_llm(user_input)
+    text_lower = user_input.lower()
+    # Cheapest tier first; stop at the first tier that resolves the message
+    for tier, handler in ROUTER_TIERS:
+        with telemetry.span("ex1", f"router_{tier}"):
+            resolved = handler(user_input, text_lower)
+        if resolved is not None:
+            route, response = resolved
+            route_counts[(tier, route)] += 1
+            telemetry.inc("router_resolved_total", app="ex1", tier=tier, route=route)
+            return response
 
 # ---------------- RUN LOOP ----------------
 if __name__ == "__main__":
-    print("Welcome to E-Commerce Chatbot (type 'exit' to quit)\n")
+    telemetry.start_server()
+    ollama_warmup.start(OLLAMA_MODEL)  # don't take questions until the model is loaded
+    print("Welcome to E-Commerce Chatbot (type 'exit' to quit, 'stats' for routing counters)\n")
     while True:
         user_input = input("You: ")
         if user_input.lower() in ["exit", "quit"]:
             print("Goodbye!")
             break
+        if user_input.lower() == "stats":
+            print(router_stats() or "No messages routed yet.", "\n")
+            continue
         response = chatbot_response(user_input)
         print("Bot:", response, "\n")
@@ -2,9 +2,16 @@ import gradio as gr
 import ollama
 from typing import List
 import json
+import queue
 import re
+import threading
 import time
 
+from shared import ollama_warmup, telemetry
+
+MODEL_NAME = "qwen2.5:0.5b"
+SYSTEM_PROMPT = "You are a professional blog writer. Create high-quality, engaging content."
+
 def clean_text(text: str) -> str:
     """
     Clean user input text by removing excessive whitespace and unwanted characters.
@@ -13,24 +20,171 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text)
     return text
 
-def generate_blog(topic: str, tone: str, length: str, outline: str, progress=gr.Progress()):
+def parse_outline(outline: str) -> List[str]:
+    """
+    Split an outline into section headings, one per line, dropping bullets and numbering.
+    """
+    sections = []
+    for line in outline.splitlines():
+        line = re.sub(r'^\s*(?:[-*•#]+|\d+[.)])\s*', '', line)
+        line = clean_text(line)
+        if line:
+            sections.append(line)
+    return sections
+
+def parse_word_target(length: str) -> int:
+    """
+    Extract the requested word count from a length string such as "500 words".
+    """
+    match = re.search(r'\d+', length)
+    return int(match.group()) if match else 500
+
+def format_metadata(start_time: float, end_time: float, first_token_time, tokens: int, word_count: int, sections: int = 1,
+                    eval_duration=None) -> str:
+    """
+    Build the metadata line: total time, time to first token, tokens/s and word count.
+    Tokens/s uses Ollama's decode time (eval_duration, ns) when given, otherwise wall clock since the first token.
+    """
+    ttft = f"{first_token_time - start_time:.2f}s" if first_token_time else "N/A"
+    if tokens and eval_duration:
+        tokens_per_sec = f"{tokens / (eval_duration / 1e9):.1f}"
+    elif first_token_time and end_time > first_token_time:
+        tokens_per_sec = f"{tokens / (end_time - first_token_time):.1f}"
+    else:
+        tokens_per_sec = "N/A"
+    mode = f" | Sections: {sections} (parallel)" if sections > 1 else ""
+    return (f"Generation Time: {end_time - start_time:.2f}s | Time to First Token: {ttft} | "
+            f"Tokens/s: {tokens_per_sec} | Word Count: {word_count}{mode} | Model: {MODEL_NAME}")
+
+def stream_part(index: int, prompt: str, events: queue.Queue, stop: threading.Event):
+    """
+    Stream one chat completion, pushing (index, token, final_chunk) events to the queue.
+    Stops early, closing the stream so Ollama stops decoding, once the stop event is set.
+    """
+    stream = None
+    try:
+        stream = ollama.chat(
+            model=MODEL_NAME,
+            messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+            stream=True,
+            keep_alive=ollama_warmup.KEEP_ALIVE
+        )
+        for chunk in stream:
+            if stop.is_set():
+                return
+            events.put((index, chunk['message']['content'], chunk if chunk.get('done') else None))
+    except Exception as e:
+        events.put((index, None, e))
+        return
+    finally:
+        if stop.is_set() and hasattr(stream, "close"):
+            stream.close()
+    events.put((index, None, None))
+
+def generate_blog_sections(topic: str, tone: str, sections: List[str], target_words: int, progress):
+    """
+    Generate the title and every outline section concurrently, then stitch them together.
+    Each section gets the full outline as shared context and an equal share of the word budget.
+    """
+    outline_text = "\n".join(f"{i}. {heading}" for i, heading in enumerate(sections, start=1))
+    section_words = max(target_words // len(sections), 50)
+    shared_context = (f'You are writing one part of a blog post about "{topic}" in a {tone} tone.\n'
+                      f"The full outline of the post is:\n{outline_text}\n")
+
+    prompts = [shared_context + "Write only a catchy title for the post. Output the title alone on one line, no quotes."]
+    for i, heading in enumerate(sections, start=1):
+        prompts.append(
+            shared_context
+            + f'Write only section {i}, "{heading}", in about {section_words} words. '
+            "Do not repeat the heading, do not write other sections, and do not add a title or closing remarks "
+            "unless this section is the conclusion."
+        )
+
+    parts = [""] * len(prompts)
+    events = queue.Queue()
+    start_time = time.time()
+    first_token_time = None
+    streamed_chunks = 0
+    eval_counts = []
+    errors = []
+    stop = threading.Event()
+    for index, prompt in enumerate(prompts):
+        threading.Thread(target=stream_part, args=(index, prompt, events, stop), daemon=True).start()
+
+    def stitch():
+        title = clean_text(parts[0]).strip('"#* ') or topic
+        body = "\n\n".join(f"## {heading}\n\n{text.strip()}" for heading, text in zip(sections, parts[1:]))
+        return f"# {title}\n\n{body}"
+
+    remaining = len(prompts)
+    try:
+        while remaining:
+            index, token, extra = events.get()
+            if token is None:
+                remaining -= 1
+                if isinstance(extra, Exception):
+                    errors.append(f"{'Title' if index == 0 else sections[index - 1]}: {extra}")
+                continue
+            if token:
+                streamed_chunks += 1
+                if first_token_time is None:
+                    first_token_time = time.time()
+            parts[index] += token
+            if extra and extra.get('eval_count'):
+                eval_counts.append(extra['eval_count'])
+            if extra:
+                telemetry.record_ollama("ex2", extra, approximate_ttft=False)
+
+            word_count = len(" ".join(parts).split())
+            progress(min(word_count / target_words, 0.99), desc=f"Generating {len(sections)} sections... {word_count}/{target_words} words")
+            yield stitch(), f"{time.time() - start_time:.2f}s", str(word_count), ""
+    finally:
+        # Also reached when Gradio cancels the generator (new click, closed tab)
+        stop.set()
+    end_time = time.time()
+    telemetry.observe("stage_latency_seconds", end_time - start_time, app="ex2", stage="llm")
+    if first_token_time:
+        telemetry.record_ttft("ex2", first_token_time - start_time)
+
+    if errors:
+        error_message = "Error generating blog sections:\n" + "\n".join(errors) + "\n\nTroubleshooting:\n1. Ensure Ollama is running\n2. Verify qwen2.5:0.5b model is installed\n3. Run: ollama pull qwen2.5:0.5b"
+        yield error_message, "N/A", "N/A", ""
+        return
+
+    blog_content = stitch()
+    word_count = len(blog_content.split())
+    tokens = sum(eval_counts) if len(eval_counts) == len(prompts) else streamed_chunks
+    progress(1.0, desc="Complete!")
+    yield blog_content, f"{end_time - start_time:.2f}s", str(word_count), format_metadata(
+        start_time, end_time, first_token_time, tokens, word_count, sections=len(sections))
+
+def generate_blog(topic: str, tone: str, length: str, outline: str, parallel_sections: bool = False, progress=gr.Progress()):
     """
     Generate a blog post using local LLM via Ollama based on user inputs.
+    Streams the post into the output box as it is generated. In parallel section mode,
+    each outline section is generated concurrently and stitched together.
     """
     if not topic.strip():
-        return "Error: Please enter a blog topic.", "N/A", "N/A", ""
+        yield "Error: Please enter a blog topic.", "N/A", "N/A", ""
+        return
 
     # Clean inputs
     topic_clean = clean_text(topic)
     tone_clean = clean_text(tone) if tone.strip() else "informative"
     length_clean = clean_text(length) if length.strip() else "500 words"
-    outline_clean = clean_text(outline) if outline.strip() else "Introduction\nMain content\nConclusion"
+    sections = parse_outline(outline) or ["Introduction", "Main content", "Conclusion"]
+    outline_clean = "\n".join(sections)
+    target_words = parse_word_target(length_clean)
+    ollama_warmup.touch()
 
-    # Show loading progress
-    progress(0.1, desc="Preparing prompt...")
-    time.sleep(0.3)
+    if parallel_sections and len(sections) > 1:
+        yield from generate_blog_sections(topic_clean, tone_clean, sections, target_words, progress)
+        return
+
+    progress(0.0, desc="Preparing prompt...")
 
     # Construct structured prompt
+    prompt_start = time.time()
     prompt = f"""
 Write a blog post about "{topic_clean}" in a {tone_clean} tone, approximately {length_clean} words.
 
@@ -39,44 +193,63 @@ Use the following outline:
 
 Make it well-structured, engaging, and plagiarism-free. Include a catchy title at the beginning.
 """
+    telemetry.observe("stage_latency_seconds", time.time() - prompt_start, app="ex2", stage="prompt_build")
 
     try:
-        progress(0.3, desc="Loading model...")
-        time.sleep(0.3)
-
-        progress(0.5, desc="Generating blog content...")
+        progress(0.0, desc="Waiting for first token...")
 
-        # Call local LLM via Ollama
+        # Stream from local LLM via Ollama
         start_time = time.time()
-        response = ollama.chat(
-            model="qwen2.5:0.5b",
+        first_token_time = None
+        blog_content = ""
+        streamed_chunks = 0
+        final_chunk = {}
+        stream = ollama.chat(
+            model=MODEL_NAME,
             messages=[{
                 "role": "system",
-                "content": "You are a professional blog writer. Create high-quality, engaging content."
+                "content": SYSTEM_PROMPT
             }, {
                 "role": "user",
                 "content": prompt
-            }]
+            }],
+            stream=True,
+            keep_alive=ollama_warmup.KEEP_ALIVE
         )
+        for chunk in stream:
+            token = chunk['message']['content']
+            if token:
+                streamed_chunks += 1
+                if first_token_time is None:
+                    first_token_time = time.time()
+            blog_content += token
+            if chunk.get('done'):
+                final_chunk = chunk
+
+            word_count = len(blog_content.split())
+            progress(min(word_count / target_words, 0.99), desc=f"Generating... {word_count}/{target_words} words")
+            yield blog_content, f"{time.time() - start_time:.2f}s", str(word_count), ""
         end_time = time.time()
+        telemetry.observe("stage_latency_seconds", end_time - start_time, app="ex2", stage="llm")
+        telemetry.record_ollama("ex2", final_chunk, ttft=first_token_time - start_time if first_token_time else None)
 
-        progress(0.9, desc="Finalizing...")
-        time.sleep(0.2)
-
-        blog_content = response['message']['content']
         generation_time = f"{end_time - start_time:.2f}s"
         word_count = len(blog_content.split())
 
+        # Prefer Ollama's own decode stats; otherwise count streamed chunks (~1 token each) over wall clock
+        tokens = final_chunk.get('eval_count') or streamed_chunks
+        eval_duration = final_chunk.get('eval_duration') if final_chunk.get('eval_count') else None
+
         # Create metadata string
-        metadata = f"Generation Time: {generation_time} | Word Count: {word_count} | Model: qwen2.5:0.5b"
+        metadata = format_metadata(start_time, end_time, first_token_time, tokens, word_count, eval_duration=eval_duration)
 
         progress(1.0, desc="Complete!")
 
-        return blog_content, generation_time, str(word_count), metadata
+        yield blog_content, generation_time, str(word_count), metadata
 
     except Exception as e:
         error_message = f"Error generating blog: {str(e)}\n\nTroubleshooting:\n1. Ensure Ollama is running\n2. Verify qwen2.5:0.5b model is installed\n3. Run: ollama pull qwen2.5:0.5b"
-        return error_message, "N/A", "N/A", ""
+        yield error_message, "N/A", "N/A", ""
 
 # Custom CSS for clean, modern design
 custom_css = """
@@ -179,6 +352,12 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft()) as demo:
                 info="Structure your blog with key points (one per line)"
             )
 
+            parallel_input = gr.Checkbox(
+                label="⚡ Parallel Section Mode",
+                value=False,
+                info="Generate the title and each outline section concurrently (faster for long posts)"
+            )
+
             generate_button = gr.Button("✨ Generate Blog Post", elem_classes=["generate-btn"], size="lg")
 
             gr.Markdown("---")
@@ -219,7 +398,7 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft()) as demo:
     # Connect button to function
     generate_button.click(
         fn=generate_blog,
-        inputs=[topic_input, tone_input, length_input, outline_input],
+        inputs=[topic_input, tone_input, length_input, outline_input, parallel_input],
         outputs=[output_box, time_output, words_output, metadata_output]
     )
 
@@ -227,5 +406,6 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft()) as demo:
 if __name__ == "__main__":
     print("Starting Blog Generator UI...")
     print("Model: qwen2.5:0.5b")
-    print("Ensure Ollama is running with: ollama pull qwen2.5:0.5b")
+    telemetry.start_server()
+    ollama_warmup.start(MODEL_NAME)  # readiness gate: launch the UI only once the model is loaded
     demo.launch(share=False, show_error=True)
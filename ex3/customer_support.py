@@ -1,4 +1,7 @@
 import ollama
+import os
+
+from shared import generation_profiles, ollama_warmup, telemetry
 
 # Step 1: Past customer-agent interactions
 past_examples = [
@@ -42,14 +45,19 @@ Reply:
 
 # Step 3: Suggest reply function
 def suggest_reply(new_query: str) -> str:
-    prompt = build_prompt(new_query)
-    response = ollama.chat(
-        model="qwen2.5:0.5b",  # make sure you pulled llama3 with: ollama pull llama3
-        messages=[
-            {"role": "system", "content": "You are a helpful customer support assistant."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    with telemetry.span("ex3", "prompt_build"):
+        prompt = build_prompt(new_query)
+    with telemetry.span("ex3", "llm"):
+        response = ollama.chat(
+            model="qwen2.5:0.5b",  # make sure you pulled llama3 with: ollama pull llama3
+            messages=[
+                {"role": "system", "content": "You are a helpful customer support assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            keep_alive=ollama_warmup.KEEP_ALIVE,
+            **generation_profiles.request_fields("support_reply")
+        )
+    telemetry.record_ollama("ex3", response)
     return response["message"]["content"].strip()
 
 # Step 4: Test run
@@ -59,3 +67,6 @@ if __name__ == "__main__":
 
     print("\nCustomer:", new_customer_query)
     print("\nSuggested Reply:\n", reply)
+
+    if os.environ.get("METRICS_JSON"):
+        telemetry.dump_json(os.environ["METRICS_JSON"])
@@ -1,4 +1,7 @@
 import ollama
+import os
+
+from shared import generation_profiles, ollama_warmup, telemetry
 
 # -----------------------------
 # Sample User Data
@@ -20,22 +23,42 @@ def build_prompt(user):
         "Do not repeat any of the liked titles. Return only a numbered list, no quotes, no explanations."
     )
 
+# -----------------------------
+# Stream a Numbered List
+# -----------------------------
+def stream_numbered_list(messages, model_name, max_items=5):
+    """Stream with the recommendations profile and stop as soon as max_items titles are complete."""
+    stream = ollama.chat(
+        model=model_name,
+        messages=messages,
+        stream=True,
+        keep_alive=ollama_warmup.KEEP_ALIVE,
+        **generation_profiles.request_fields("recommendations")
+    )
+    parser = generation_profiles.NumberedListParser(max_items=max_items)
+    with telemetry.span("ex4", "llm"):
+        return generation_profiles.stream_until(
+            stream, parser,
+            on_done=lambda chunk: telemetry.record_ollama("ex4", chunk),
+            on_stop=lambda streamed_chunks: telemetry.record_early_stop("ex4", streamed_chunks),
+        )
+
 # -----------------------------
 # Generate Recommendations
 # -----------------------------
 def get_recommendations(user, model_name="qwen2.5:0.5b"):
-    prompt = build_prompt(user)
-    response = ollama.chat(
-        model=model_name,
-        messages=[
+    with telemetry.span("ex4", "prompt_build"):
+        prompt = build_prompt(user)
+    return stream_numbered_list(
+        [
             {
                 "role": "system",
                 "content": "You are a recommendation engine. Always respond with a concise numbered list of 5 recommendations only."
             },
             {"role": "user", "content": prompt}
-        ]
+        ],
+        model_name
     )
-    return response["message"]["content"]
 
 # -----------------------------
 # Display Results
@@ -58,19 +81,19 @@ def test_new_user_query(query, model_name="qwen2.5:0.5b"):
         "Based on this, suggest 5 movies that are similar but not the same as any commonly known titles mentioned. "
         "Only respond with a clean numbered list of titles, no paragraphs or explanations."
     )
-    response = ollama.chat(
-        model=model_name,
-        messages=[
+    recommendations = stream_numbered_list(
+        [
             {
                 "role": "system",
                 "content": "You are a recommendation system. Output only a concise numbered list of 5 movies based on the user's taste."
             },
             {"role": "user", "content": refined_prompt}
-        ]
+        ],
+        model_name
     )
     print("Query:", query)
     print("Recommendations:")
-    print(response["message"]["content"])
+    print(recommendations)
 
 # -----------------------------
 # Main Execution
@@ -84,3 +107,6 @@ if __name__ == "__main__":
     # Test with new query
     print("\nTesting with new user query...\n")
     test_new_user_query("I like fantasy movies with magic and dragons.")
+
+    if os.environ.get("METRICS_JSON"):
+        telemetry.dump_json(os.environ["METRICS_JSON"])
@@ -0,0 +1,215 @@
+import requests
+from PyPDF2 import PdfReader
+from docx import Document
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from revision_cache import RevisionCache, split_sections
+
+from shared import ollama_warmup, telemetry
+from shared.singleflight import SingleFlight, make_key
+
+OLLAMA_URL = f"{ollama_warmup.OLLAMA_HOST}/api/generate"
+MODEL_NAME = "qwen2.5:0.5b"
+SECTION_WORKERS = 4
+
+revision_cache = RevisionCache()
+llm_flights = SingleFlight("ex5")
+
+# Text Extraction
+def extract_text(file):
+    """Extract text from PDF, DOCX, or TXT files (upload object or path)."""
+    if file is None:
+        return None
+
+    filename = file if isinstance(file, str) else file.name
+    ext = os.path.splitext(filename)[1].lower()
+    text = ""
+    try:
+        if ext == ".pdf":
+            reader = PdfReader(filename)
+            for page in reader.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+        elif ext == ".docx":
+            doc = Document(filename)
+            text = "\n".join([p.text for p in doc.paragraphs if p.text.strip() != ""])
+        elif ext == ".txt":
+            with open(filename, "r", encoding="utf-8") as f:
+                text = f.read()
+        else:
+            return None
+        return text.strip()
+    except Exception as e:
+        return None
+
+# Ollama Helper
+def ollama_stream(payload):
+    """Stream parsed response lines from the Ollama API."""
+    start_time = time.time()
+    first_token_time = None
+    response = requests.post(OLLAMA_URL, json=payload, stream=True)
+    with response:
+        if response.status_code != 200:
+            yield {"error": f"{response.status_code} - {response.text}"}
+            return
+        for line in response.iter_lines():
+            if not line:
+                continue
+            try:
+                data = json.loads(line.decode("utf-8"))
+            except json.JSONDecodeError:
+                continue
+            if data.get("response") and first_token_time is None:
+                first_token_time = time.time()
+            if data.get("done"):
+                telemetry.record_ollama("ex5", data, ttft=first_token_time - start_time if first_token_time else None)
+            yield data
+    telemetry.observe("stage_latency_seconds", time.time() - start_time, app="ex5", stage="llm")
+
+def ollama_generate(prompt, max_tokens=1000):
+    """Generate text using Ollama API. Identical concurrent requests share one generation."""
+    # Ollama only honours these inside "options" (num_predict is its max-tokens limit)
+    options = {"temperature": 0.2, "num_predict": max_tokens}
+    payload = {"model": MODEL_NAME, "prompt": prompt, "stream": True, "keep_alive": ollama_warmup.KEEP_ALIVE,
+               "options": options}
+    ollama_warmup.touch()
+    try:
+        full_response = ""
+        for data in llm_flights.stream(make_key(MODEL_NAME, options, prompt), lambda: ollama_stream(payload)):
+            if "error" in data:
+                return f"Error: {data['error']}"
+            full_response += data.get("response", "")
+        return full_response.strip() if full_response else "No response content."
+    except Exception as e:
+        return f"Error connecting to Ollama API: {e}"
+
+# Summarization Prompt Builder
+def build_summary_prompt(text, summary_level, doc_type):
+    """Build prompt based on summary level and document type."""
+    if summary_level == "Short":
+        return f"Summarize the following {doc_type} in 100 words (no preamble, no markdown, output only summary):\n\n{text}"
+    elif summary_level == "Medium":
+        return f"Summarize the following {doc_type} in 200 words highlighting key points (no preamble no markdown, output only summary):\n\n{text}"
+    else:  # Detailed
+        if doc_type == "Legal":
+            return f"Provide a detailed section-wise summary of this legal document. Include Parties, Payment Terms, Liabilities, Confidentiality, Risks, Termination (no preamble no markdown, output only summary):\n\n{text}"
+        else:
+            return f"Provide a detailed section-wise summary of this literary text. Include Characters, Plot, Themes, Moral Lessons (no preamble no markdown, output only summary):\n\n{text}"
+
+# Incremental Summarization
+def summarize_section(section_text, doc_type):
+    """Summarize one section of a document (map step)."""
+    prompt = f"Summarize this section of a {doc_type} document in 2-3 sentences, keeping names, amounts, dates and obligations (no preamble, no markdown, output only summary):\n\n{section_text}"
+    return ollama_generate(prompt, max_tokens=200)
+
+def document_key(text, filename, document_id=""):
+    """Key under which revisions of a document are tracked.
+
+    An explicit document ID wins; otherwise the filename plus the hash of the first
+    section, so unrelated uploads that happen to share a filename are kept apart.
+    """
+    if document_id and document_id.strip():
+        return document_id.strip()
+    sections = split_sections(text)
+    first_hash = sections[0]["hash"][:16] if sections else "empty"
+    return f"{os.path.basename(filename)}:{first_hash}"
+
+def summarize_document(text, summary_level, doc_type, doc_key=None, limiter=None):
+    """Summarize via cached section summaries; only new or edited sections hit the LLM.
+
+    Returns the summary and, when doc_key is given, a section-level diff against the
+    previously analyzed revision of the same document. limiter (e.g. a
+    threading.BoundedSemaphore shared with other callers) is held around every single
+    LLM call, so section requests count against the caller's concurrency limit.
+    """
+    limiter = limiter or nullcontext()
+    sections = split_sections(text)
+    changes = revision_cache.record_revision(doc_key, sections) if doc_key else None
+
+    if len(sections) <= 1:
+        with limiter:
+            return ollama_generate(build_summary_prompt(text, summary_level, doc_type)), changes
+
+    def summarize_limited(i):
+        with limiter:
+            return summarize_section(sections[i]["text"], doc_type)
+
+    keys = [f"{MODEL_NAME}:{doc_type}:{s['hash']}" for s in sections]
+    section_summaries = [revision_cache.get_summary(k) for k in keys]
+    missing = [i for i, summary in enumerate(section_summaries) if summary is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=SECTION_WORKERS) as pool:
+            fresh = list(pool.map(summarize_limited, missing))
+        for i, summary in zip(missing, fresh):
+            section_summaries[i] = summary
+        revision_cache.put_summaries(
+            {keys[i]: summary for i, summary in zip(missing, fresh) if not summary.startswith("Error")}
+        )
+
+    # Reduce step always reruns so the overall summary reflects the current revision
+    combined = "\n\n".join(f"[{s['title']}]\n{summary}" for s, summary in zip(sections, section_summaries))
+    with limiter:
+        return ollama_generate(build_summary_prompt(combined, summary_level, doc_type)), changes
+
+# Key Clause / Theme Extraction
+def extract_keywords(text, doc_type):
+    """Extract keywords, clauses, or themes from document."""
+    if doc_type == "Legal":
+        prompt = f"Extract key clauses from this legal document. Include Payment Terms, Liabilities, Confidentiality, Risks, Termination.\n\n{text}"
+    else:
+        prompt = f"Extract key elements from this literary text. Include main Characters, Plot Events, Themes, Moral Lessons.\n\n{text}"
+    return ollama_generate(prompt, max_tokens=400)
+
+# Q&A Prompt Builder
+def answer_question(text, user_question):
+    """Answer user questions based on document content."""
+    prompt = f"""
+Answer the following question accurately based on the document content below:
+Content:
+{text}
+Question: {user_question}
+"""
+    return ollama_generate(prompt, max_tokens=500)
+
+# Export Function
+def export_results(summary, qa, keywords, export_format="txt", output_path=None):
+    """Export analysis results to file."""
+    filename = output_path or f"document_analysis.{export_format}"
+    try:
+        if export_format == "txt":
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write("---Summary---\n" + summary + "\n\n")
+                f.write("---Q&A---\n" + qa + "\n\n")
+                f.write("---Keywords / Clauses---\n" + keywords)
+        elif export_format == "docx":
+            doc = Document()
+            doc.add_heading("AI Document Analysis Report", 0)
+            doc.add_paragraph("---Summary---\n" + summary)
+            doc.add_paragraph("---Q&A---\n" + qa)
+            doc.add_paragraph("---Keywords / Clauses---\n" + keywords)
+            doc.save(filename)
+        elif export_format == "pdf":
+            from reportlab.lib.pagesizes import A4
+            from reportlab.pdfgen import canvas
+            c = canvas.Canvas(filename, pagesize=A4)
+            c.setFont("Helvetica", 10)
+            y = 800
+            for section in ["Summary", "Q&A", "Keywords / Clauses"]:
+                c.drawString(50, y, f"---{section}---")
+                y -= 20
+                content = {"Summary": summary, "Q&A": qa, "Keywords / Clauses": keywords}[section]
+                for line in content.split("\n"):
+                    c.drawString(50, y, line[:90])
+                    y -= 15
+                    if y < 50:
+                        c.showPage()
+                        y = 800
+            c.save()
+        return filename
+    except Exception as e:
+        return f"Export failed: {str(e)}"
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis import (
+    MODEL_NAME,
+    answer_question,
+    export_results,
+    extract_keywords,
+    extract_text,
+    summarize_document,
+)
+from revision_cache import format_changes
+from shared import ollama_warmup, telemetry
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Input Collection
+def collect_files(source):
+    """Collect documents from a directory (recursive) or a manifest file (one path per line)."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return sorted(os.path.abspath(p) for p in paths)
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(os.path.abspath(os.path.join(base_dir, line)))
+    return paths
+
+# Resume Support
+def load_completed(output_path):
+    """Return paths already analyzed successfully in a previous run."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from an interrupted write
+            if record.get("status") == "ok":
+                completed.add(record["path"])
+    return completed
+
+def export_name(path, source, export_format):
+    """Build a flat, collision-free export filename from the document path."""
+    root = source if os.path.isdir(source) else os.path.dirname(os.path.abspath(source))
+    relative = os.path.relpath(path, os.path.abspath(root))
+    stem = os.path.splitext(relative)[0].replace(os.sep, "__")
+    return f"{stem}.{export_format}"
+
+# Batch Processing
+async def analyze_one(path, pool, doc_slots, llm_slots, args):
+    """Extract one document in the process pool, then run its LLM stages."""
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    record = {"path": path, "doc_type": args.doc_type, "summary_level": args.summary_level}
+
+    def limited(fn, *fn_args):
+        with llm_slots:
+            return fn(*fn_args)
+
+    async def llm(fn, *fn_args):
+        return await asyncio.to_thread(limited, fn, *fn_args)
+
+    async with doc_slots:
+        try:
+            # Timed here: metrics recorded inside the worker processes never reach this process
+            with telemetry.span("ex5", "extraction"):
+                text = await loop.run_in_executor(pool, extract_text, path)
+        except Exception as e:
+            text = None
+            record["error"] = f"Extraction failed: {e}"
+        if not text:
+            record["status"] = "error"
+            record.setdefault("error", "Unable to extract text.")
+            return record
+
+        stages = [
+            # Takes llm_slots per section request rather than once for the whole document
+            asyncio.to_thread(summarize_document, text, args.summary_level, args.doc_type, path, llm_slots),
+            llm(extract_keywords, text, args.doc_type),
+        ]
+        if args.question:
+            stages.append(llm(answer_question, text, args.question))
+        results = await asyncio.gather(*stages)
+
+    record["summary"], changes = results[0]
+    record["changes"] = format_changes(changes)
+    record["keywords"] = results[1]
+    record["qa"] = results[2] if args.question else ""
+    record["word_count"] = len(text.split())
+
+    failed = [r for r in [record["summary"], *results[1:]] if r.startswith("Error")]
+    if not failed and args.export_format:
+        output_path = os.path.join(args.export_dir, export_name(path, args.source, args.export_format))
+        with telemetry.span("ex5", "export"):
+            record["export"] = await asyncio.to_thread(
+                export_results, record["summary"], record["qa"] or "No question asked",
+                record["keywords"], args.export_format, output_path
+            )
+        if record["export"].startswith("Export failed"):
+            failed.append(record["export"])
+
+    record["status"] = "error" if failed else "ok"
+    if failed:
+        record["error"] = failed[0]
+    record["processing_time"] = round(time.time() - start_time, 2)
+    return record
+
+async def run_batch(args):
+    """Analyze every pending document and append one JSONL record per document."""
+    paths = collect_files(args.source)
+    completed = load_completed(args.output) if args.resume else set()
+    pending = [p for p in paths if p not in completed]
+    print(f"📄 {len(paths)} documents found, {len(completed & set(paths))} already done, {len(pending)} to analyze")
+
+    if args.export_format:
+        os.makedirs(args.export_dir, exist_ok=True)
+
+    doc_slots = asyncio.Semaphore(args.max_in_flight)
+    # Shared by every LLM request, including summarize_document's section threads
+    llm_slots = threading.BoundedSemaphore(args.concurrency)
+    ok = failed = 0
+
+    mode = "a" if args.resume else "w"
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, open(args.output, mode, encoding="utf-8") as out:
+        tasks = [asyncio.create_task(analyze_one(p, pool, doc_slots, llm_slots, args)) for p in pending]
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            record = await task
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+            print(f"[{done}/{len(pending)}] {record['status']}: {record['path']}")
+
+    print(f"✅ Batch complete: {ok} analyzed, {failed} failed. Results: {args.output}")
+    if args.metrics_json:
+        telemetry.dump_json(args.metrics_json)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-analyze a folder or manifest of PDF/DOCX/TXT documents.")
+    parser.add_argument("source", help="Directory of documents or manifest file with one path per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL results file")
+    parser.add_argument("--doc-type", choices=["Legal", "Literary"], default="Legal")
+    parser.add_argument("--summary-level", choices=["Short", "Medium", "Detailed"], default="Medium")
+    parser.add_argument("--question", default="", help="Optional question asked of every document")
+    parser.add_argument("--export-format", choices=["txt", "docx", "pdf"], help="Also export a report per document")
+    parser.add_argument("--export-dir", default="exports", help="Directory for per-document exports")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Extraction processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent LLM requests")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="Max extracted documents held in memory")
+    parser.add_argument("--metrics-json", help="Write stage latency and token metrics to this JSON file")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Overwrite the results file instead of skipping completed documents")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print("=" * 60)
+    print("🚀 Starting Batch Document Analysis")
+    print("=" * 60)
+    print(f"📋 Model: {MODEL_NAME}")
+    print(f"📂 Source: {args.source}")
+    print("=" * 60)
+    ollama_warmup.start(MODEL_NAME)
+    try:
+        asyncio.run(run_batch(args))
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted. Re-run the same command to resume.")
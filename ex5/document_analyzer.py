@@ -1,172 +1,54 @@
 import gradio as gr
-import requests
-from PyPDF2 import PdfReader
-from docx import Document
-import json
-import os
 import time
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-MODEL_NAME = "qwen2.5:0.5b"
-
-# Text Extraction
-def extract_text(file):
-    """Extract text from PDF, DOCX, or TXT files."""
-    if file is None:
-        return None
-
-    filename = file.name
-    text = ""
-    try:
-        if filename.endswith(".pdf"):
-            reader = PdfReader(filename)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        elif filename.endswith(".docx"):
-            doc = Document(filename)
-            text = "\n".join([p.text for p in doc.paragraphs if p.text.strip() != ""])
-        elif filename.endswith(".txt"):
-            with open(filename, "r", encoding="utf-8") as f:
-                text = f.read()
-        else:
-            return None
-        return text.strip()
-    except Exception as e:
-        return None
-
-# Ollama Helper
-def ollama_generate(prompt, max_tokens=1000):
-    """Generate text using Ollama API."""
-    try:
-        response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": MODEL_NAME,
-                "prompt": prompt,
-                "stream": True,
-                "temperature": 0.2,
-                "max_tokens": max_tokens
-            },
-            stream=True
-        )
-        if response.status_code != 200:
-            return f"Error: {response.status_code} - {response.text}"
-
-        full_response = ""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    data = json.loads(line.decode("utf-8"))
-                    if "response" in data:
-                        full_response += data["response"]
-                except json.JSONDecodeError:
-                    continue
-        return full_response.strip() if full_response else "No response content."
-    except Exception as e:
-        return f"Error connecting to Ollama API: {e}"
-
-# Summarization Prompt Builder
-def build_summary_prompt(text, summary_level, doc_type):
-    """Build prompt based on summary level and document type."""
-    if summary_level == "Short":
-        return f"Summarize the following {doc_type} in 100 words (no preamble, no markdown, output only summary):\n\n{text}"
-    elif summary_level == "Medium":
-        return f"Summarize the following {doc_type} in 200 words highlighting key points (no preamble no markdown, output only summary):\n\n{text}"
-    else:  # Detailed
-        if doc_type == "Legal":
-            return f"Provide a detailed section-wise summary of this legal document. Include Parties, Payment Terms, Liabilities, Confidentiality, Risks, Termination (no preamble no markdown, output only summary):\n\n{text}"
-        else:
-            return f"Provide a detailed section-wise summary of this literary text. Include Characters, Plot, Themes, Moral Lessons (no preamble no markdown, output only summary):\n\n{text}"
-
-# Key Clause / Theme Extraction
-def extract_keywords(text, doc_type):
-    """Extract keywords, clauses, or themes from document."""
-    if doc_type == "Legal":
-        prompt = f"Extract key clauses from this legal document. Include Payment Terms, Liabilities, Confidentiality, Risks, Termination.\n\n{text}"
-    else:
-        prompt = f"Extract key elements from this literary text. Include main Characters, Plot Events, Themes, Moral Lessons.\n\n{text}"
-    return ollama_generate(prompt, max_tokens=400)
-
-# Q&A Prompt Builder
-def answer_question(text, user_question):
-    """Answer user questions based on document content."""
-    prompt = f"""
-Answer the following question accurately based on the document content below:
-Content:
-{text}
-Question: {user_question}
-"""
-    return ollama_generate(prompt, max_tokens=500)
-
-# Export Function
-def export_results(summary, qa, keywords, export_format="txt"):
-    """Export analysis results to file."""
-    filename = f"document_analysis.{export_format}"
-    try:
-        if export_format == "txt":
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write("---Summary---\n" + summary + "\n\n")
-                f.write("---Q&A---\n" + qa + "\n\n")
-                f.write("---Keywords / Clauses---\n" + keywords)
-        elif export_format == "docx":
-            doc = Document()
-            doc.add_heading("AI Document Analysis Report", 0)
-            doc.add_paragraph("---Summary---\n" + summary)
-            doc.add_paragraph("---Q&A---\n" + qa)
-            doc.add_paragraph("---Keywords / Clauses---\n" + keywords)
-            doc.save(filename)
-        elif export_format == "pdf":
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
-            c = canvas.Canvas(filename, pagesize=A4)
-            c.setFont("Helvetica", 10)
-            y = 800
-            for section in ["Summary", "Q&A", "Keywords / Clauses"]:
-                c.drawString(50, y, f"---{section}---")
-                y -= 20
-                content = {"Summary": summary, "Q&A": qa, "Keywords / Clauses": keywords}[section]
-                for line in content.split("\n"):
-                    c.drawString(50, y, line[:90])
-                    y -= 15
-                    if y < 50:
-                        c.showPage()
-                        y = 800
-            c.save()
-        return filename
-    except Exception as e:
-        return f"Export failed: {str(e)}"
+from analysis import (
+    MODEL_NAME,
+    OLLAMA_URL,
+    answer_question,
+    document_key,
+    export_results,
+    extract_keywords,
+    extract_text,
+    summarize_document,
+)
+from revision_cache import format_changes
+from shared import ollama_warmup, telemetry
 
 # Main Processing Function
-def analyze_document(file, doc_type, summary_level, user_question, export_format, progress=gr.Progress()):
+def analyze_document(file, doc_type, summary_level, user_question, export_format, document_id="", progress=gr.Progress()):
     """Main analysis function with progress tracking."""
     if file is None:
-        return "❌ Please upload a document first.", "", "", "", "0", "0s"
+        return "❌ Please upload a document first.", "", "", "", "", "0", "0s"
 
     progress(0.1, desc="Extracting text from document...")
     start_time = time.time()
 
-    text = extract_text(file)
+    with telemetry.span("ex5", "extraction"):
+        text = extract_text(file)
     if text is None:
-        return "❌ Error: Unable to extract text. Ensure file is not corrupted and format is supported.", "", "", "", "0", "0s"
+        return "❌ Error: Unable to extract text. Ensure file is not corrupted and format is supported.", "", "", "", "", "0", "0s"
 
     word_count = len(text.split())
     char_count = len(text)
 
     progress(0.3, desc="Generating summary...")
-    summary = ollama_generate(build_summary_prompt(text, summary_level, doc_type))
+    with telemetry.span("ex5", "summary"):
+        doc_key = document_key(text, file.name, document_id)
+        summary, changes = summarize_document(text, summary_level, doc_type, doc_key=doc_key)
 
     progress(0.5, desc="Extracting keywords/clauses...")
-    keywords = extract_keywords(text, doc_type)
+    with telemetry.span("ex5", "keywords"):
+        keywords = extract_keywords(text, doc_type)
 
     qa = ""
     if user_question and user_question.strip() != "":
         progress(0.7, desc="Answering your question...")
-        qa = answer_question(text, user_question)
+        with telemetry.span("ex5", "qa"):
+            qa = answer_question(text, user_question)
 
     progress(0.9, desc="Exporting results...")
-    exported_file = export_results(summary, qa if qa else "No question asked", keywords, export_format)
+    with telemetry.span("ex5", "export"):
+        exported_file = export_results(summary, qa if qa else "No question asked", keywords, export_format)
 
     end_time = time.time()
     processing_time = f"{end_time - start_time:.2f}s"
@@ -175,7 +57,7 @@ def analyze_document(file, doc_type, summary_level, user_question, export_format
 
     export_message = f"✅ Analysis complete! File exported: {exported_file}"
 
-    return summary, qa, keywords, export_message, str(word_count), processing_time
+    return summary, qa, keywords, format_changes(changes), export_message, str(word_count), processing_time
 
 # Custom CSS for clean, modern design
 custom_css = """
@@ -276,6 +158,12 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft(), title="AI Document Analyz
                 info="Query specific information from the document"
             )
 
+            document_id_input = gr.Textbox(
+                placeholder="e.g., supplier-agreement-2024",
+                label="🔖 Document ID (Optional)",
+                info="Same ID = revisions of the same document; leave empty to match by filename and opening section"
+            )
+
             analyze_button = gr.Button("🚀 Analyze Document", elem_classes=["analyze-btn"], size="lg")
 
             gr.Markdown("---")
@@ -320,6 +208,16 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft(), title="AI Document Analyz
                         elem_classes=["output-section"]
                     )
 
+                with gr.TabItem("🔄 Changes"):
+                    changes_output = gr.Textbox(
+                        lines=18,
+                        label="",
+                        show_label=False,
+                        placeholder="Section-level changes since the previous revision will appear here...",
+                        interactive=False,
+                        elem_classes=["output-section"]
+                    )
+
                 with gr.TabItem("💾 Export Status"):
                     export_output = gr.Textbox(
                         lines=18,
@@ -342,8 +240,8 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft(), title="AI Document Analyz
     # Connect button to function
     analyze_button.click(
         fn=analyze_document,
-        inputs=[file_input, doc_type_input, summary_level_input, user_question_input, export_format_input],
-        outputs=[summary_output, qa_output, keywords_output, export_output, words_stat, time_stat]
+        inputs=[file_input, doc_type_input, summary_level_input, user_question_input, export_format_input, document_id_input],
+        outputs=[summary_output, qa_output, keywords_output, changes_output, export_output, words_stat, time_stat]
     )
 
 
@@ -355,5 +253,6 @@ if __name__ == "__main__":
     print(f"🌐 Ollama URL: {OLLAMA_URL}")
     print("📄 Supported formats: PDF, DOCX, TXT")
     print("=" * 60)
-    print("\n⚠️  Ensure Ollama is running with: ollama pull qwen2.5:0.5b\n")
+    telemetry.start_server()
+    ollama_warmup.start(MODEL_NAME)  # readiness gate: launch the UI only once the model is loaded
     demo.launch(share=False, show_error=True)
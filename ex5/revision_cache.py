@@ -0,0 +1,153 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+
+CACHE_DIR = "analysis_cache"
+MIN_SECTION_WORDS = 150
+MAX_SECTION_WORDS = 800
+BOUNDARY_DIVISOR = 8  # ~1 in 8 lines can close a section once it is long enough
+
+# Headings that start a new section: numbered clauses ("4.2 Payment"), "Section 4", "ARTICLE II"
+HEADING_RE = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*[.)]\s+\S|\d+\.\d+\s+\S|(?:section|article|clause|schedule|chapter)\s+[\w.]+)",
+    re.IGNORECASE,
+)
+
+# Section Splitting
+def _normalize(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+def _hash(text):
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+def _is_heading(line):
+    line = line.strip()
+    if not line or len(line) > 80:
+        return False
+    if line.isupper():
+        return True
+    return bool(HEADING_RE.match(line)) and not line.endswith(".")
+
+def split_sections(text):
+    """Split text into content-defined sections so an edit only changes the sections it touches.
+
+    Boundaries depend on the lines themselves (headings, or a line whose hash hits the
+    divisor once the section is long enough), not on running offsets, so inserting or
+    deleting words early in the document does not shift every later boundary.
+    """
+    sections = []
+    current, words = [], 0
+
+    def close():
+        nonlocal current, words
+        body = "\n".join(current).strip()
+        if body:
+            sections.append({"title": current[0].strip()[:80], "text": body, "hash": _hash(body)})
+        current, words = [], 0
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if current and _is_heading(line) and words >= MIN_SECTION_WORDS // 3:
+            close()
+        current.append(line)
+        words += len(line.split())
+        line_hash = int(_hash(line)[:8], 16)
+        if words >= MAX_SECTION_WORDS or (words >= MIN_SECTION_WORDS and line_hash % BOUNDARY_DIVISOR == 0):
+            close()
+    close()
+    return sections
+
+# Section Diff
+def diff_sections(old_sections, new_sections):
+    """Compare two revisions section by section."""
+    matcher = difflib.SequenceMatcher(
+        None, [s["hash"] for s in old_sections], [s["hash"] for s in new_sections], autojunk=False
+    )
+    changes = {"unchanged": 0, "modified": [], "added": [], "removed": []}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            changes["unchanged"] += i2 - i1
+        elif tag == "replace":
+            paired = min(i2 - i1, j2 - j1)
+            changes["modified"] += [new_sections[j]["title"] for j in range(j1, j1 + paired)]
+            changes["added"] += [new_sections[j]["title"] for j in range(j1 + paired, j2)]
+            changes["removed"] += [old_sections[i]["title"] for i in range(i1 + paired, i2)]
+        elif tag == "insert":
+            changes["added"] += [new_sections[j]["title"] for j in range(j1, j2)]
+        elif tag == "delete":
+            changes["removed"] += [old_sections[i]["title"] for i in range(i1, i2)]
+    return changes
+
+def format_changes(changes):
+    """Render a section diff as plain text."""
+    if changes is None:
+        return "First revision of this document. No previous version to compare."
+    lines = [
+        f"Modified: {len(changes['modified'])} | Added: {len(changes['added'])} | "
+        f"Removed: {len(changes['removed'])} | Unchanged: {changes['unchanged']}",
+        "",
+    ]
+    for marker, key in [("~", "modified"), ("+", "added"), ("-", "removed")]:
+        lines += [f"{marker} {title}" for title in changes[key]]
+    if not (changes["modified"] or changes["added"] or changes["removed"]):
+        lines.append("No changes since the previous revision.")
+    return "\n".join(lines)
+
+# Persistent Cache
+class RevisionCache:
+    """SQLite store of section summaries (by content hash) and each document's last revision.
+
+    One row per key, so writes stay small as the cache grows, and WAL mode lets the UI
+    and batch processes share the same analysis_cache/ directory.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, "revisions.db")
+        self.lock = threading.Lock()
+        self.ready = False
+
+    def _connect(self):
+        with self.lock:
+            if not self.ready:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("CREATE TABLE IF NOT EXISTS section_summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+                    conn.execute("CREATE TABLE IF NOT EXISTS documents (doc_key TEXT PRIMARY KEY, sections TEXT NOT NULL)")
+                    conn.commit()
+                self.ready = True
+        # Autocommit mode; transactions are opened explicitly where a read must precede a write
+        return closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None))
+
+    def get_summary(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT summary FROM section_summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_summaries(self, new_summaries):
+        if not new_summaries:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT OR REPLACE INTO section_summaries (key, summary) VALUES (?, ?)",
+                             list(new_summaries.items()))
+            conn.execute("COMMIT")
+
+    def record_revision(self, doc_key, sections):
+        """Store the new revision and return its diff against the previous one (None if first)."""
+        stored = [{"title": s["title"], "hash": s["hash"]} for s in sections]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # no other writer between reading and replacing the revision
+            row = conn.execute("SELECT sections FROM documents WHERE doc_key = ?", (doc_key,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO documents (doc_key, sections) VALUES (?, ?)",
+                         (doc_key, json.dumps(stored, ensure_ascii=False)))
+            conn.execute("COMMIT")
+        previous = json.loads(row[0]) if row else None
+        return diff_sections(previous, stored) if previous is not None else None
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+from collections import deque
+
+# Conversation Journal
+class ConversationJournal:
+    """Per-session, append-only journal of conversation turns.
+
+    Turns are appended to a JSONL file through a buffered writer and the file is rotated
+    once it exceeds max_bytes (keeping at most max_files rotated files). Only the last
+    `window` turns are kept in memory; reports are built by streaming from disk.
+    """
+
+    def __init__(self, session_id=None, directory="journals", max_bytes=1_000_000, max_files=5,
+                 window=20, flush_every=10, buffer_size=64 * 1024):
+        # PID suffix: two processes started in the same second must not share a journal
+        self.session_id = session_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.flush_every = flush_every
+        self.buffer_size = buffer_size
+        self.window = deque(maxlen=window)
+        self.seq = 0
+        self.pending = 0
+        self.exported_seq = None  # last turn written to the report, None before first export
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"session-{self.session_id}.jsonl")
+        self.file = open(self.path, "a", encoding="utf-8", buffering=buffer_size)
+        # Tracked here because TextIOWrapper.tell() flushes the write buffer
+        self.bytes_written = os.path.getsize(self.path)
+
+    def _rotated_path(self, n):
+        return os.path.join(self.directory, f"session-{self.session_id}.{n}.jsonl")
+
+    def _rotate(self):
+        """Shift session.N.jsonl -> session.N+1.jsonl, dropping the oldest beyond max_files."""
+        self.file.close()
+        oldest = self._rotated_path(self.max_files)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for n in range(self.max_files - 1, 0, -1):
+            if os.path.exists(self._rotated_path(n)):
+                os.replace(self._rotated_path(n), self._rotated_path(n + 1))
+        os.replace(self.path, self._rotated_path(1))
+        self.file = open(self.path, "a", encoding="utf-8", buffering=self.buffer_size)
+        self.bytes_written = 0
+
+    def append(self, user, assistant):
+        """Record one turn: buffered append to disk plus the bounded in-memory window."""
+        self.seq += 1
+        turn = {"seq": self.seq, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "user": user, "assistant": assistant}
+        self.window.append(turn)
+        line = json.dumps(turn, ensure_ascii=False) + "\n"
+        self.file.write(line)
+        self.bytes_written += len(line.encode("utf-8"))
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.flush()
+        if self.bytes_written >= self.max_bytes:
+            self.flush()
+            self._rotate()
+
+    def flush(self):
+        self.file.flush()
+        self.pending = 0
+
+    def iter_turns(self, after_seq=0):
+        """Stream turns from disk (oldest rotated file first) with seq greater than after_seq."""
+        self.flush()
+        paths = [self._rotated_path(n) for n in range(self.max_files, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        turn = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if turn["seq"] > after_seq:
+                        yield turn
+
+    def write_report(self, report_path):
+        """Write the report: the first export streams the whole journal, later ones append only new turns.
+
+        Turns already deleted by rotation (beyond max_files) cannot be exported; the report
+        says how many are missing instead of silently skipping them.
+        """
+        first_export = self.exported_seq is None
+        expected = 1 if first_export else self.exported_seq + 1
+        with open(report_path, "w" if first_export else "a", encoding="utf-8") as f:
+            for turn in self.iter_turns(after_seq=expected - 1):
+                if turn["seq"] > expected:
+                    f.write(self._rotated_out_note(turn["seq"] - expected))
+                f.write(f"User: {turn['user']}\nAssistant: {turn['assistant']}\n\n")
+                expected = turn["seq"] + 1
+            if self.seq >= expected:
+                f.write(self._rotated_out_note(self.seq - expected + 1))
+        self.exported_seq = self.seq
+
+    @staticmethod
+    def _rotated_out_note(count):
+        return f"[{count} earlier turn{'s' if count != 1 else ''} rotated out of the journal and not included]\n\n"
+
+    def close(self):
+        self.flush()
+        self.file.close()
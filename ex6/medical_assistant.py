@@ -1,46 +1,35 @@
 import requests
 
+from conversation_journal import ConversationJournal
+from symptom_matcher import SymptomMatcher
+
+from shared import generation_profiles, ollama_warmup, telemetry
+
 # Ollama API setup
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_URL = f"{ollama_warmup.OLLAMA_HOST}/api/generate"
 MODEL_NAME = "qwen2.5:0.5b"
 
-# Step 1: Knowledge Base
-knowledge_base = {
-    "cold": {
-        "keywords": ["sneeze", "runny nose", "congestion", "cough"],
-        "advice": "It may be a common cold. Rest, drink warm fluids, and consider over-the-counter cold remedies.",
-        "severity": "Mild"
-        },
-    "flu": {
-        "keywords": ["fever", "body ache", "chills", "fatigue"],
-        "advice": "It may be the flu. Stay hydrated, rest, and monitor your temperature.",
-        "severity": "Moderate"
-        },
-    "migraine": {
-        "keywords": ["headache", "nausea", "sensitivity to light", "sensitivity to sound"],
-        "advice": "It may be a migraine. Rest in a quiet, dark room and consider over-the-counter pain relief.",
-        "severity": "Mild"
-        },
-    "indigestion": {
-        "keywords": ["stomach pain", "nausea", "bloating", "heartburn"],
-        "advice": "It may be indigestion. Avoid spicy food, drink water, and try small light meals.",
-        "severity": "Moderate"
-        },
-    "chest pain": {
-        "keywords": ["chest pain", "shortness of breath", "pressure"],
-        "advice": "Potentially serious. Seek immediate medical attention.",
-        "severity": "Severe"
-    }
-}
+# Step 1: Knowledge Base (compiled once into a single keyword automaton)
+KNOWLEDGE_BASE_FILE = "knowledge_base.json"
+symptom_matcher = SymptomMatcher.from_file(KNOWLEDGE_BASE_FILE)
+
+REPORT_FILE = "health_report.txt"
 
-conversation_memory = []
+# Conversation history: appended to an on-disk journal, only a bounded window kept in memory
+journal = ConversationJournal(directory="journals", max_bytes=1_000_000, max_files=5, window=20)
+conversation_memory = journal.window
 
 # Step 2: Knowledge Base Match
-def check_knowledge_base(symptoms):
-    for condition, data in knowledge_base.items():
-        if any(word in symptoms.lower() for word in data["keywords"]):
-            return f"Condition: {condition.title()}\nSeverity: {data['severity']}\nAdvice: {data['advice']}"
-    return None
+def check_knowledge_base(symptoms, ranked=None, max_conditions=3):
+    if ranked is None:
+        ranked, _ = symptom_matcher.match(symptoms)
+    if not ranked:
+        return None
+    lines = []
+    for condition, data, matched in ranked[:max_conditions]:
+        lines.append(f"Condition: {condition.title()}\nSeverity: {data['severity']}\n"
+                     f"Matched: {', '.join(matched)}\nAdvice: {data['advice']}")
+    return "\n\n".join(lines)
 
 # Step 3: Ask Ollama Qwen
 def ollama_response(symptoms):
@@ -53,41 +42,48 @@ Analyze the following symptoms and provide:
 Always end with: "Disclaimer: I am not a doctor."
 Symptoms: {symptoms}
 """
-    payload = {"model": MODEL_NAME, "prompt": prompt, "stream": False}
-    response = requests.post(OLLAMA_URL, json=payload)
+    payload = {"model": MODEL_NAME, "prompt": prompt, "stream": False, "keep_alive": ollama_warmup.KEEP_ALIVE,
+               **generation_profiles.request_fields("symptom_analysis")}
+    ollama_warmup.touch()
+    with telemetry.span("ex6", "llm"):
+        response = requests.post(OLLAMA_URL, json=payload)
     if response.status_code == 200:
-        return response.json().get("response", "").strip()
+        data = response.json()
+        telemetry.record_ollama("ex6", data)
+        return data.get("response", "").strip()
     else:
         return f"Error: {response.text}"
 
 # Step 4: Combine KB + Model
 def medical_assistant(symptoms):
-    kb_result = check_knowledge_base(symptoms)
+    with telemetry.span("ex6", "kb_match"):
+        ranked, is_emergency = symptom_matcher.match(symptoms)
+    kb_result = check_knowledge_base(symptoms, ranked)
     if kb_result:
         result = kb_result
     else:
         result = ollama_response(symptoms)
 
     # Emergency alert
-    if any(word in symptoms.lower() for word in ["chest pain", "shortness of breath", "breathe"]):
+    if is_emergency:
         result = "⚠️ EMERGENCY ALERT: Seek immediate medical help!\n" + result
 
     disclaimer = "\nDisclaimer: This information is for general awareness and not a substitute for professional medical advice."
     if "Disclaimer" not in result:
         result += disclaimer
 
-    conversation_memory.append({"user": symptoms, "assistant": result})
+    journal.append(symptoms, result)
     return result
 
 # Step 5: Export Health Report
 def export_report():
-    with open("health_report.txt", "w") as f:
-        for turn in conversation_memory:
-            f.write(f"User: {turn['user']}\nAssistant: {turn['assistant']}\n\n")
-    print("Health report saved as health_report.txt")
+    journal.write_report(REPORT_FILE)
+    print(f"Health report saved as {REPORT_FILE}")
 
 # Step 6: Interactive Loop
 if __name__ == "__main__":
+    telemetry.start_server()
+    ollama_warmup.start(MODEL_NAME)  # don't take symptoms until the model is loaded
     print("AI Medical Assistant (Demo)")
     print("Type 'exit' to quit or 'report' to export.\n")
 
@@ -95,6 +91,7 @@ if __name__ == "__main__":
         user_input = input("Enter your symptoms: ")
         if user_input.lower() == "exit":
             export_report()
+            journal.close()
             print("Goodbye! Stay healthy.")
             break
         elif user_input.lower() == "report":
@@ -0,0 +1,91 @@
+import json
+from collections import deque
+
+SEVERITY_RANK = {"Mild": 1, "Moderate": 2, "Severe": 3}
+EMERGENCY = "__emergency__"
+
+# Aho-Corasick Automaton
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every keyword occurring in a text in one pass."""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # per state: (keyword, labels) pairs ending here
+
+    def add(self, keyword, label):
+        state = 0
+        for ch in keyword.lower():
+            if ch not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][ch] = len(self.goto) - 1
+            state = self.goto[state][ch]
+        for existing_keyword, labels in self.output[state]:
+            if existing_keyword == keyword.lower():
+                labels.add(label)
+                return
+        self.output[state].append((keyword.lower(), {label}))
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[child] = target if target != child else 0  # root children fail to root
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Return {label: set of matched keywords} for every keyword found in text."""
+        matches = {}
+        state = 0
+        for ch in text.lower():
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for keyword, labels in self.output[state]:
+                for label in labels:
+                    matches.setdefault(label, set()).add(keyword)
+        return matches
+
+# Symptom Matcher
+class SymptomMatcher:
+    """Knowledge base compiled once into a single automaton for conditions and emergency keywords."""
+
+    def __init__(self, conditions, emergency_keywords):
+        self.conditions = conditions
+        self.automaton = KeywordAutomaton()
+        for condition, data in conditions.items():
+            for keyword in data["keywords"]:
+                self.automaton.add(keyword, condition)
+        for keyword in emergency_keywords:
+            self.automaton.add(keyword, EMERGENCY)
+        self.automaton.build()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            kb = json.load(f)
+        return cls(kb["conditions"], kb.get("emergency_keywords", []))
+
+    def match(self, symptoms):
+        """Scan symptoms once; return (ranked conditions, is_emergency).
+
+        Conditions are ranked by number of distinct matched keywords, then severity.
+        Each ranked entry is (condition, data, matched_keywords).
+        """
+        found = self.automaton.find(symptoms)
+        is_emergency = EMERGENCY in found
+        ranked = sorted(
+            ((c, self.conditions[c], sorted(kw)) for c, kw in found.items() if c != EMERGENCY),
+            key=lambda item: (len(item[2]), SEVERITY_RANK.get(item[1]["severity"], 0)),
+            reverse=True,
+        )
+        return ranked, is_emergency
@@ -0,0 +1,108 @@
+"""
+Per-task generation limits for Ollama calls, plus client-side early stopping.
+
+    from shared import generation_profiles as gp
+    ollama.chat(model=..., messages=..., **gp.request_fields("support_reply"))
+
+    parser = gp.NumberedListParser(max_items=5)
+    text = gp.stream_until(ollama.chat(..., stream=True, **gp.request_fields("recommendations")), parser)
+
+request_fields() returns the `options` (num_predict, stop, temperature) and, when the
+profile defines a JSON schema, the `format` field; the same keys work for ollama.chat()
+and the REST /api/generate payload.
+"""
+import re
+
+PROFILES = {
+    # ex4: five titles, one per line
+    "recommendations": {
+        "num_predict": 120,
+        "stop": ["\n6.", "\n6)", "\n\n\n"],
+        "temperature": 0.7,
+    },
+    # ex3: a short support reply, never a continued dialogue
+    "support_reply": {
+        "num_predict": 220,
+        "stop": ["\nCustomer:", "\nAgent:"],
+        "temperature": 0.3,
+    },
+    # ex1: answer from product details only
+    "product_qa": {
+        "num_predict": 160,
+        "stop": ["\nUser Query:"],
+        "temperature": 0.2,
+    },
+    # ex6: causes, home care, when to see a doctor, disclaimer
+    "symptom_analysis": {
+        "num_predict": 400,
+        "temperature": 0.3,
+    },
+}
+
+
+def request_fields(task, **overrides):
+    """Ollama request fields for a task: {"options": {...}} plus "format" if the profile has a schema."""
+    profile = dict(PROFILES[task], **overrides)
+    schema = profile.pop("schema", None)
+    fields = {"options": {k: v for k, v in profile.items() if v is not None}}
+    if schema is not None:
+        fields["format"] = schema
+    return fields
+
+
+class NumberedListParser:
+    """Collects "1. Title" style items from streamed text and reports when enough are complete."""
+
+    ITEM_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.+?)\s*$")
+
+    def __init__(self, max_items=5):
+        self.max_items = max_items
+        self.text = ""
+
+    def items(self, complete_only=True):
+        lines = self.text.split("\n")
+        if complete_only:
+            lines = lines[:-1]  # the last line may still be streaming
+        items = []
+        for line in lines:
+            match = self.ITEM_RE.match(line)
+            if match:
+                items.append(match.group(1))
+        return items
+
+    def feed(self, text):
+        """Add streamed text; True once max_items complete items have been seen."""
+        self.text += text
+        return "\n" in text and len(self.items()) >= self.max_items
+
+    def result(self):
+        items = self.items(complete_only=False)[:self.max_items]
+        if not items:
+            return self.text.strip()
+        return "\n".join(f"{i}. {item}" for i, item in enumerate(items, start=1))
+
+
+def stream_until(stream, parser, on_done=None, on_stop=None):
+    """Consume a streamed ollama.chat response until the parser has what it needs.
+
+    Closing the stream early drops the HTTP connection, which stops decoding in Ollama.
+    on_done(final_chunk) is called if the stream reaches its natural end; otherwise
+    on_stop(streamed_chunks) is called when it is cut short, since no final chunk with
+    Ollama's token counts will arrive.
+    """
+    streamed_chunks = 0
+    try:
+        for chunk in stream:
+            if chunk.get("done") and on_done is not None:
+                on_done(chunk)
+            content = chunk["message"]["content"]
+            if content:
+                streamed_chunks += 1
+            if parser.feed(content):
+                if not chunk.get("done") and on_stop is not None:
+                    on_stop(streamed_chunks)
+                break
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()
+    return parser.result()
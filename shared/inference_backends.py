@@ -0,0 +1,165 @@
+"""
+Pluggable CPU inference backends for the sentence encoder and the sentiment classifier.
+
+Backends (select with INFERENCE_BACKEND or the backend argument):
+    torch      - stock SentenceTransformer / transformers pipeline in fp32 (default)
+    onnx-int8  - ONNX Runtime with dynamic int8 quantization, exported once and cached
+
+The ONNX backend needs: pip install "optimum[onnxruntime]"
+
+Accuracy parity and throughput against the torch backend:
+    python -m shared.inference_backends --check
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+DEFAULT_ENCODER = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_SENTIMENT = "distilbert-base-uncased-finetuned-sst-2-english"
+BACKENDS = ("torch", "onnx-int8")
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gpt-lab-onnx"))
+
+# Parity thresholds for --check
+MIN_COSINE = 0.99
+MIN_LABEL_AGREEMENT = 0.95
+
+
+def get_backend(backend=None):
+    backend = backend or os.environ.get("INFERENCE_BACKEND", "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+    return backend
+
+
+# ---------------- ONNX EXPORT ----------------
+def _quantized_model_dir(model_name, task):
+    """Export model_name to ONNX and quantize it to int8 once; return the cached directory."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    target_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__") + "-int8")
+    if os.path.exists(os.path.join(target_dir, "model_quantized.onnx")):
+        return target_dir
+
+    model_cls = ORTModelForFeatureExtraction if task == "feature-extraction" else ORTModelForSequenceClassification
+    export_dir = target_dir + "-fp32"
+    model_cls.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+
+    quantizer = ORTQuantizer.from_pretrained(export_dir)
+    # Dynamic quantization: weights int8 ahead of time, activations quantized per batch
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=target_dir, quantization_config=qconfig)
+    return target_dir
+
+
+class OnnxEncoder:
+    """int8 ONNX Runtime encoder matching SentenceTransformer.encode for all-MiniLM-L6-v2
+    (mean pooling over tokens followed by L2 normalization)."""
+
+    def __init__(self, model_name=DEFAULT_ENCODER):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        model_dir = _quantized_model_dir(model_name, "feature-extraction")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name="model_quantized.onnx")
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=256, return_tensors="np")
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.linalg.norm(pooled, axis=1, keepdims=True))
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, 384), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+# ---------------- LOADERS ----------------
+def load_encoder(backend=None, model_name=DEFAULT_ENCODER):
+    """Return an object with SentenceTransformer-compatible encode()."""
+    if get_backend(backend) == "onnx-int8":
+        return OnnxEncoder(model_name)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def load_sentiment(backend=None, model_name=DEFAULT_SENTIMENT):
+    """Return a transformers sentiment-analysis pipeline running on the selected backend."""
+    from transformers import AutoTokenizer, pipeline
+
+    if get_backend(backend) == "onnx-int8":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        model_dir = _quantized_model_dir(model_name, "text-classification")
+        model = ORTModelForSequenceClassification.from_pretrained(model_dir, file_name="model_quantized.onnx")
+        return pipeline("sentiment-analysis", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+    return pipeline("sentiment-analysis", model=model_name)
+
+
+# ---------------- PARITY CHECK & BENCHMARK ----------------
+def _load_check_texts():
+    import pandas as pd
+
+    ex1_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ex1")
+    faq = pd.read_csv(os.path.join(ex1_dir, "ecommerce_faq.csv"))["prompt"].tolist()
+    reviews = pd.read_csv(os.path.join(ex1_dir, "reviews.csv"))["review"].tolist()
+    return faq, reviews
+
+
+def _throughput(fn, texts, repeats):
+    fn(texts[:4])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(texts)
+    return repeats * len(texts) / (time.perf_counter() - start)
+
+
+def run_check(candidate="onnx-int8", repeats=5):
+    """Compare candidate against torch on ex1's FAQ prompts and reviews; return True if parity holds."""
+    faq, reviews = _load_check_texts()
+    encoder_texts = faq + reviews
+
+    reference_encoder, candidate_encoder = load_encoder("torch"), load_encoder(candidate)
+    ref = np.asarray(reference_encoder.encode(encoder_texts))
+    cand = np.asarray(candidate_encoder.encode(encoder_texts))
+    cosines = (ref * cand).sum(axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1))
+    faq_ref = ref[:len(faq)] @ ref[:len(faq)].T
+    faq_cand = cand[:len(faq)] @ cand[:len(faq)].T
+    top1_agreement = float(np.mean(faq_ref.argsort(axis=1)[:, -2] == faq_cand.argsort(axis=1)[:, -2]))
+
+    reference_sentiment, candidate_sentiment = load_sentiment("torch"), load_sentiment(candidate)
+    ref_labels = [r["label"] for r in reference_sentiment(reviews)]
+    cand_labels = [r["label"] for r in candidate_sentiment(reviews)]
+    label_agreement = float(np.mean([a == b for a, b in zip(ref_labels, cand_labels)]))
+
+    print(f"Encoder cosine vs torch: min {cosines.min():.4f}, mean {cosines.mean():.4f} (threshold {MIN_COSINE})")
+    print(f"FAQ nearest-neighbour agreement: {top1_agreement:.2%}")
+    print(f"Sentiment label agreement: {label_agreement:.2%} (threshold {MIN_LABEL_AGREEMENT:.0%})")
+
+    print("\nThroughput (texts/s, CPU):")
+    for name, encoder, sentiment in [("torch", reference_encoder, reference_sentiment),
+                                     (candidate, candidate_encoder, candidate_sentiment)]:
+        enc_tps = _throughput(encoder.encode, encoder_texts, repeats)
+        sent_tps = _throughput(sentiment, reviews, repeats)
+        print(f"  {name:<10} encoder {enc_tps:8.1f} | sentiment {sent_tps:8.1f}")
+
+    passed = cosines.min() >= MIN_COSINE and label_agreement >= MIN_LABEL_AGREEMENT
+    print("\nParity check", "PASSED" if passed else "FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy parity check and throughput benchmark for inference backends.")
+    parser.add_argument("--check", action="store_true", help="Run parity check and benchmark against torch")
+    parser.add_argument("--backend", default="onnx-int8", choices=BACKENDS)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    if args.check:
+        raise SystemExit(0 if run_check(args.backend, args.repeats) else 1)
+    parser.print_help()
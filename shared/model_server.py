@@ -0,0 +1,220 @@
+"""
+Local model server: hosts the sentence encoder and sentiment classifier once and serves
+many client processes over a Unix socket, batching concurrent requests per model.
+
+Start the server:
+    python -m shared.model_server --socket /tmp/gpt-lab-models.sock
+
+Connections are authenticated with a shared key: MODEL_SERVER_AUTHKEY if set, otherwise
+a key file readable only by its owner (MODEL_SERVER_KEY_FILE, default
+~/.cache/gpt-lab-models.key) that the server creates on first start. The socket itself
+is also restricted to its owner.
+
+Use from any app (drop-in replacements for SentenceTransformer.encode / pipeline(...)):
+    from shared.model_server import RemoteEncoder, RemoteSentiment
+    embedding_model = RemoteEncoder("/tmp/gpt-lab-models.sock")
+    sentiment_pipeline = RemoteSentiment("/tmp/gpt-lab-models.sock")
+"""
+import argparse
+import os
+import queue
+import secrets
+import socket
+import stat
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from shared.inference_backends import BACKENDS, DEFAULT_ENCODER, DEFAULT_SENTIMENT, load_encoder, load_sentiment
+
+DEFAULT_SOCKET = "/tmp/gpt-lab-models.sock"
+DEFAULT_KEY_FILE = os.path.expanduser("~/.cache/gpt-lab-models.key")
+MAX_BATCH = 64
+MAX_WAIT_SECONDS = 0.005
+
+
+# ---------------- AUTH ----------------
+def load_authkey(key_file=None, create=False):
+    """Return the connection authkey from MODEL_SERVER_AUTHKEY or the owner-only key file.
+
+    Messages are pickled, so only processes holding the key may connect. With create=True
+    (the server) a missing key file is generated with mode 0600.
+    """
+    if os.environ.get("MODEL_SERVER_AUTHKEY"):
+        return os.environ["MODEL_SERVER_AUTHKEY"].encode("utf-8")
+    key_file = key_file or os.environ.get("MODEL_SERVER_KEY_FILE", DEFAULT_KEY_FILE)
+    if create and not os.path.exists(key_file):
+        os.makedirs(os.path.dirname(key_file) or ".", exist_ok=True)
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    try:
+        if os.stat(key_file).st_mode & 0o077:
+            raise RuntimeError(f"Model server key file {key_file} must not be readable by others (chmod 600 it)")
+        with open(key_file, "r", encoding="utf-8") as f:
+            return f.read().strip().encode("utf-8")
+    except FileNotFoundError:
+        raise RuntimeError(f"No model server key: set MODEL_SERVER_AUTHKEY or start the server to create {key_file}")
+
+
+def socket_in_use(socket_path):
+    """True if a server is already accepting connections on socket_path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+# ---------------- SERVER ----------------
+class Batcher:
+    """Collects requests for one model and runs them as a single batch."""
+
+    def __init__(self, run_batch, max_batch=MAX_BATCH, max_wait=MAX_WAIT_SECONDS):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, texts):
+        """Queue texts and block until the batch containing them has run."""
+        done = threading.Event()
+        slot = {"texts": texts, "done": done}
+        self.requests.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise RuntimeError(slot["error"])
+        return slot["result"]
+
+    def _loop(self):
+        while True:
+            pending = [self.requests.get()]
+            size = len(pending[0]["texts"])
+            # Gather whatever else arrives within max_wait, up to max_batch texts
+            while size < self.max_batch:
+                try:
+                    slot = self.requests.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                pending.append(slot)
+                size += len(slot["texts"])
+            texts = [text for slot in pending for text in slot["texts"]]
+            try:
+                results = self.run_batch(texts)
+                offset = 0
+                for slot in pending:
+                    slot["result"] = results[offset:offset + len(slot["texts"])]
+                    offset += len(slot["texts"])
+            except Exception as e:
+                for slot in pending:
+                    slot["error"] = str(e)
+            for slot in pending:
+                slot["done"].set()
+
+
+def load_batchers(encoder_name=DEFAULT_ENCODER, sentiment_model=DEFAULT_SENTIMENT, backend=None):
+    """Load both models once on the selected inference backend and wrap each in a batcher."""
+    encoder = load_encoder(backend, encoder_name)
+    classifier = load_sentiment(backend, sentiment_model)
+    return {
+        "encode": Batcher(lambda texts: encoder.encode(texts, batch_size=MAX_BATCH)),
+        "sentiment": Batcher(lambda texts: classifier(texts, batch_size=MAX_BATCH)),
+    }
+
+
+def handle_client(conn, batchers):
+    """Serve one client connection: (op, texts) requests, ("ok", result) / ("error", message) replies."""
+    with conn:
+        while True:
+            try:
+                op, texts = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                conn.send(("ok", batchers[op].submit(texts)))
+            except KeyError:
+                conn.send(("error", f"Unknown operation: {op}"))
+            except Exception as e:
+                conn.send(("error", str(e)))
+
+
+def serve(socket_path=DEFAULT_SOCKET, encoder_name=DEFAULT_ENCODER, sentiment_model=DEFAULT_SENTIMENT, backend=None):
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            raise SystemExit(f"{socket_path} exists and is not a socket; refusing to replace it")
+        if socket_in_use(socket_path):
+            raise SystemExit(f"A model server is already listening on {socket_path}")
+        os.remove(socket_path)  # stale socket left by a server that exited
+    authkey = load_authkey(create=True)
+    print("Loading models...")
+    batchers = load_batchers(encoder_name, sentiment_model, backend)
+    old_umask = os.umask(0o177)  # create the socket owner-only, with no window where others could connect
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    with listener:
+        print(f"Model server listening on {socket_path}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, OSError) as e:
+                print(f"Rejected model server connection: {e}")
+                continue
+            threading.Thread(target=handle_client, args=(conn, batchers), daemon=True).start()
+
+
+# ---------------- CLIENT ----------------
+class ModelClient:
+    """Connection to the model server; safe to share between threads."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, authkey=None):
+        self.conn = Client(socket_path, family="AF_UNIX", authkey=authkey or load_authkey())
+        self.lock = threading.Lock()
+
+    def request(self, op, texts):
+        with self.lock:
+            self.conn.send((op, list(texts)))
+            status, result = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Model server error: {result}")
+        return result
+
+
+class RemoteEncoder:
+    """Drop-in for SentenceTransformer.encode backed by the model server."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, client=None):
+        self.client = client or ModelClient(socket_path)
+
+    def encode(self, sentences, **kwargs):
+        if isinstance(sentences, str):
+            return self.client.request("encode", [sentences])[0]
+        return self.client.request("encode", sentences)
+
+
+class RemoteSentiment:
+    """Drop-in for a transformers sentiment-analysis pipeline backed by the model server."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, client=None):
+        self.client = client or ModelClient(socket_path)
+
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return list(self.client.request("sentiment", inputs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the shared encoder and sentiment models over a Unix socket.")
+    parser.add_argument("--socket", default=os.environ.get("MODEL_SERVER_SOCKET", DEFAULT_SOCKET))
+    parser.add_argument("--encoder", default=DEFAULT_ENCODER)
+    parser.add_argument("--sentiment-model", default=DEFAULT_SENTIMENT)
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Defaults to INFERENCE_BACKEND or torch")
+    args = parser.parse_args()
+    serve(args.socket, args.encoder, args.sentiment_model, args.backend)
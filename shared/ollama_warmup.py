@@ -0,0 +1,154 @@
+"""
+Model warm-up, keep_alive policy and readiness check for Ollama-backed apps.
+
+    from shared import ollama_warmup
+    ollama_warmup.start(MODEL_NAME)       # blocks until the model is resident, then starts the heartbeat
+    ...
+    ollama_warmup.touch()                 # on every request, so the heartbeat knows the app has traffic
+    ollama.chat(..., keep_alive=ollama_warmup.KEEP_ALIVE)
+
+Configuration (environment):
+    OLLAMA_HOST            Ollama base URL (default http://localhost:11434)
+    OLLAMA_KEEP_ALIVE      how long Ollama keeps the model loaded after a request: a duration
+                           ("30m", "1h") or seconds ("300"); default 30m, -1 = forever
+    OLLAMA_IDLE_TIMEOUT    stop refreshing keep_alive after this many seconds without traffic (default 3600)
+    OLLAMA_READY_TIMEOUT   give up waiting for the model after this many seconds (default 300)
+"""
+import json
+import os
+import re
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+if not OLLAMA_HOST.startswith("http"):
+    OLLAMA_HOST = "http://" + OLLAMA_HOST
+
+
+def parse_keep_alive(value):
+    """Normalize a keep_alive setting for the Ollama API.
+
+    Ollama parses string values as Go durations, so "300" or "-1" would be rejected with
+    HTTP 400; plain numbers are sent as numbers (seconds) instead.
+    """
+    value = str(value).strip()
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    if re.fullmatch(r"-?\d+\.\d+", value):
+        return float(value)
+    return value
+
+
+KEEP_ALIVE = parse_keep_alive(os.environ.get("OLLAMA_KEEP_ALIVE", "30m"))
+IDLE_TIMEOUT = float(os.environ.get("OLLAMA_IDLE_TIMEOUT", 3600))
+READY_TIMEOUT = float(os.environ.get("OLLAMA_READY_TIMEOUT", 300))
+
+_heartbeat = None
+
+
+def keep_alive_seconds(keep_alive=KEEP_ALIVE):
+    """Convert an Ollama keep_alive value ("30m", "1h", "300s", 300, -1) to seconds; negative means forever."""
+    value = str(keep_alive).strip()
+    if re.fullmatch(r"-?\d+(\.\d+)?", value):
+        return float(value)
+    total = 0.0
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        total += float(amount) * {"h": 3600, "m": 60, "s": 1, "ms": 0.001}[unit]
+    return total
+
+
+def _request(path, payload=None, timeout=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(f"{OLLAMA_HOST}{path}", data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8") or "{}")
+
+
+def warm_up(model, keep_alive=KEEP_ALIVE, timeout=None):
+    """Load the model (an empty prompt only loads it) and set its keep_alive."""
+    _request("/api/generate", {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}, timeout=timeout)
+
+
+def is_resident(model):
+    """True if Ollama currently has the model loaded in memory."""
+    try:
+        loaded = _request("/api/ps", timeout=5).get("models", [])
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+    return any(m.get("name") == model or m.get("model") == model for m in loaded)
+
+
+def wait_until_ready(model, timeout=READY_TIMEOUT, keep_alive=KEEP_ALIVE):
+    """Block until the model is loaded; raise SystemExit if it is not ready within timeout."""
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            start = time.perf_counter()
+            # Bounded so a server that accepts but never answers cannot outlast the deadline
+            warm_up(model, keep_alive, timeout=max(deadline - time.monotonic(), 1))
+            if is_resident(model):
+                print(f"Model {model} is loaded (warm-up {time.perf_counter() - start:.1f}s, keep_alive={keep_alive})")
+                return
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code != 404:  # a bad request will not succeed on retry; 404 = not pulled yet
+                raise SystemExit(f"Ollama rejected the warm-up request for {model}: HTTP {e.code} "
+                                 f"{e.read().decode('utf-8', 'replace').strip()}")
+            print(f"Waiting for Ollama at {OLLAMA_HOST} to load {model} (attempt {attempt}): {e}")
+        except (urllib.error.URLError, socket.timeout, OSError, ValueError) as e:
+            print(f"Waiting for Ollama at {OLLAMA_HOST} to load {model} (attempt {attempt}): {e}")
+        if time.monotonic() >= deadline:
+            raise SystemExit(f"Model {model} not ready after {timeout:.0f}s. Ensure Ollama is running "
+                             f"(ollama serve) and the model is pulled (ollama pull {model}).")
+        time.sleep(min(5, max(deadline - time.monotonic(), 0)))
+
+
+class KeepAliveHeartbeat:
+    """Refreshes the model's keep_alive in the background while the app has recent traffic."""
+
+    def __init__(self, model, keep_alive=KEEP_ALIVE, idle_timeout=IDLE_TIMEOUT):
+        self.model = model
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.last_activity = time.monotonic()
+        self.interval = max(keep_alive_seconds(keep_alive) / 2, 10)
+        self._stop = threading.Event()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def start(self):
+        if keep_alive_seconds(self.keep_alive) < 0:
+            return self  # Ollama keeps the model loaded forever; nothing to refresh
+        threading.Thread(target=self._loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            if time.monotonic() - self.last_activity > self.idle_timeout:
+                continue  # idle: let Ollama unload the model
+            try:
+                warm_up(self.model, self.keep_alive, timeout=self.interval)
+            except (urllib.error.URLError, socket.timeout, OSError, ValueError) as e:
+                print(f"Keep-alive refresh for {self.model} failed: {e}")
+
+
+def start(model, keep_alive=KEEP_ALIVE):
+    """Readiness gate plus heartbeat: call before the app starts accepting traffic."""
+    global _heartbeat
+    wait_until_ready(model, keep_alive=keep_alive)
+    _heartbeat = KeepAliveHeartbeat(model, keep_alive).start()
+    return _heartbeat
+
+
+def touch():
+    """Mark app traffic so the heartbeat keeps the model resident."""
+    if _heartbeat is not None:
+        _heartbeat.touch()
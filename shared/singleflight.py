@@ -0,0 +1,124 @@
+"""
+In-flight request coalescing for LLM generations.
+
+Concurrent callers asking for the same (model, options, prompt) share one generation:
+the first caller starts it on a background thread, every caller (including late joiners)
+receives the full stream of chunks, and the generation is cancelled once all callers
+have stopped listening. Finished generations are not cached; a new request after
+completion starts a new generation.
+
+Usage:
+    flights = SingleFlight("ex1")
+    key = make_key(model, options, messages)
+    for chunk in flights.stream(key, lambda: ollama.chat(model=model, messages=messages, stream=True)):
+        ...
+"""
+import hashlib
+import json
+import threading
+
+from shared import telemetry
+
+
+def make_key(model, options, prompt):
+    """Stable key for a generation request; prompt may be a string or a chat message list."""
+    payload = json.dumps({"model": model, "options": options or {}, "prompt": prompt}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cancelled = False
+        self.subscribers = 0
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """Shares identical in-flight streamed generations between concurrent callers."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def stream(self, key, start_stream):
+        """Return an iterator over the chunks of the generation for key.
+
+        start_stream() is only called for the first caller and must return an iterator
+        of chunks; it runs on a background thread so a caller leaving early does not
+        stop the generation for the others.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            flight.subscribers += 1
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, start_stream), daemon=True).start()
+        else:
+            telemetry.inc("llm_coalesced_requests_total", app=self.app)
+        return self._subscribe(key, flight)
+
+    def _produce(self, key, flight, start_stream):
+        stream = None
+        stopped = False
+        try:
+            stream = start_stream()
+            for chunk in stream:
+                with flight.cond:
+                    if flight.cancelled:
+                        stopped = True
+                        break
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if stopped:
+                # Counted here, not in _leave: only a generation that was actually cut short
+                telemetry.inc("llm_cancelled_generations_total", app=self.app)
+                if hasattr(stream, "close"):
+                    stream.close()  # stop decoding on the server as well
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _subscribe(self, key, flight):
+        index = 0
+        try:
+            while True:
+                with flight.cond:
+                    while index >= len(flight.chunks) and not flight.done:
+                        flight.cond.wait()
+                    pending = flight.chunks[index:]
+                    index += len(pending)
+                    finished = flight.done and index >= len(flight.chunks)
+                for chunk in pending:
+                    yield chunk
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self._leave(key, flight)
+
+    def _leave(self, key, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers > 0:
+                return
+            # Last listener left: new callers must start a fresh generation
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            # done is set under cond, so a generation that already finished is never cancelled
+            if not flight.done:
+                flight.cancelled = True
+                flight.cond.notify_all()
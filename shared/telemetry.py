@@ -0,0 +1,218 @@
+"""
+Lightweight in-process metrics shared by all apps: stage latency histograms, token
+counters and throughput, exposed as Prometheus text and JSON.
+
+Usage:
+    from shared import telemetry
+
+    with telemetry.span("ex1", "embedding"):
+        embedding = model.encode(text)
+    telemetry.record_ollama("ex1", response)
+
+    telemetry.start_server()            # http://127.0.0.1:9464/metrics and /metrics.json
+    telemetry.dump_json("metrics.json")
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+HELP = {
+    "stage_latency_seconds": "Latency of each pipeline stage",
+    "llm_time_to_first_token_seconds": "Time from request to first generated token",
+    "llm_tokens_per_second": "Decode throughput reported by Ollama",
+    "llm_prompt_tokens_total": "Prompt tokens evaluated by Ollama",
+    "llm_completion_tokens_total": "Completion tokens generated by Ollama",
+    "llm_requests_total": "LLM requests completed",
+    "llm_early_stopped_requests_total": "Streamed LLM requests closed by the client before the final chunk",
+    "llm_coalesced_requests_total": "Requests that joined an identical in-flight generation",
+    "llm_cancelled_generations_total": "Generations cancelled after every caller left",
+    "router_resolved_total": "Messages resolved per router tier and route",
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> {"buckets": [...counts], "sum": float, "count": int}
+_counters = {}    # (name, labels) -> float
+_bucket_bounds = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Record one observation in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        _bucket_bounds.setdefault(name, buckets)
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": [0] * len(_bucket_bounds[name]), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(_bucket_bounds[name]):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def span(app, stage):
+    """Time a block and record it as stage_latency_seconds{app, stage}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_latency_seconds", time.perf_counter() - start, app=app, stage=stage)
+
+
+def _field(response, key):
+    try:
+        return response[key]
+    except (KeyError, TypeError, IndexError):
+        return None
+
+
+def record_ttft(app, seconds):
+    observe("llm_time_to_first_token_seconds", seconds, app=app)
+
+
+def record_ollama(app, response, ttft=None, approximate_ttft=True):
+    """Record token counts and throughput from an Ollama response (or final streamed chunk).
+
+    When ttft is not measured by the caller (non-streaming calls), it is approximated by
+    Ollama's load + prompt evaluation durations unless approximate_ttft is False.
+    """
+    prompt_tokens = _field(response, "prompt_eval_count")
+    completion_tokens = _field(response, "eval_count")
+    eval_duration = _field(response, "eval_duration")
+    inc("llm_requests_total", app=app)
+    if prompt_tokens:
+        inc("llm_prompt_tokens_total", prompt_tokens, app=app)
+    if completion_tokens:
+        inc("llm_completion_tokens_total", completion_tokens, app=app)
+        if eval_duration:
+            observe("llm_tokens_per_second", completion_tokens / (eval_duration / 1e9),
+                    buckets=THROUGHPUT_BUCKETS, app=app)
+    if ttft is None and approximate_ttft:
+        load = _field(response, "load_duration") or 0
+        prompt_eval = _field(response, "prompt_eval_duration") or 0
+        if load or prompt_eval:
+            ttft = (load + prompt_eval) / 1e9
+    if ttft is not None:
+        record_ttft(app, ttft)
+
+
+def record_early_stop(app, streamed_chunks):
+    """Record a streamed request the client closed early; Ollama sends no token stats for it.
+
+    Completion tokens are approximated by the streamed chunk count (~1 token each).
+    """
+    inc("llm_requests_total", app=app)
+    inc("llm_early_stopped_requests_total", app=app)
+    if streamed_chunks:
+        inc("llm_completion_tokens_total", streamed_chunks, app=app)
+
+
+# ---------------- EXPORT ----------------
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                      for k, v in _histograms.items()}
+        bounds = dict(_bucket_bounds)
+
+    for name in sorted({k[0] for k in counters}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for name in sorted({k[0] for k in histograms}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), hist in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(bounds[name], hist["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Return all metrics as a JSON-serializable dict."""
+    with _lock:
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(_counters.items())],
+            "histograms": [{"name": name, "labels": dict(labels), "count": hist["count"], "sum": hist["sum"],
+                            "mean": hist["sum"] / hist["count"] if hist["count"] else 0.0,
+                            "buckets": dict(zip(map(str, _bucket_bounds[name]), hist["buckets"]))}
+                           for (name, labels), hist in sorted(_histograms.items())],
+        }
+
+
+def dump_json(path=None):
+    """Return metrics as JSON, also writing them to path when given."""
+    text = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = render_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = dump_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=None, host="127.0.0.1"):
+    """Serve /metrics and /metrics.json on a background thread (port from METRICS_PORT, default 9464)."""
+    port = int(port or os.environ.get("METRICS_PORT", 9464))
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Metrics endpoint disabled ({host}:{port}: {e})")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics: http://{host}:{port}/metrics (JSON: /metrics.json)")
+    return server